@@ -1,169 +1,250 @@
 #! /usr/bin/env python3
 ''' Run cool maze generating algorithms. '''
 import random
+import numpy as np
+from numba import njit
+
+# Direction bits, as used by Cell.links_mask and Grid.link_mask()
+N, S, E, W = 1, 2, 4, 8
+
+# Row/column offset to the neighbor in each direction
+_DIRECTION_OFFSETS = {N: (-1, 0), S: (1, 0), E: (0, 1), W: (0, -1)}
+
+# The same offsets indexed by the 0-3 directions the Numba kernels draw,
+# in N, S, W, E order
+_DR = np.array([-1, 1, 0, 0], dtype=np.int8)
+_DC = np.array([0, 0, -1, 1], dtype=np.int8)
 
 class Cell:
-    ''' Represents a single cell of a maze.  Cells know their neighbors
-        and know if they are linked (connected) to each.  Cells have
-        four potential neighbors, in NSEW directions.
-    '''  
-    def __init__(self, row, column):
+    ''' A lightweight view of a single cell of a maze.  Cells know their
+        neighbors and know if they are linked (connected) to each.  Cells
+        have four potential neighbors, in NSEW directions.
+
+        A Cell stores nothing but its grid and its location; the walls
+        themselves live in the grid's wall arrays, so views can be created
+        and thrown away freely.  Two views of the same location are equal.
+    '''
+    __slots__ = ('grid', 'row', 'column')
+
+    def __init__(self, grid, row, column):
         assert row >= 0
         assert column >= 0
+        self.grid = grid
         self.row = row
         self.column = column
-        self.links = {}
-        self.north = None
-        self.south = None
-        self.east  = None
-        self.west  = None
-        self.visit = False
-        
-    def link(self, cell, bidirectional=True):
-        ''' Carve a connection to another cell (i.e. the maze connects them)'''
-        assert isinstance(cell, Cell)
-        self.links[cell] = True
-        if bidirectional:
-            cell.link(self, bidirectional=False)
-        
-    def unlink(self, cell, bidirectional=True):
-        ''' Remove a connection to another cell (i.e. the maze 
+
+    @property
+    def north(self):
+        if self.row > 0:
+            return Cell(self.grid, self.row-1, self.column)
+        return None
+
+    @property
+    def south(self):
+        if self.row+1 < self.grid.num_rows:
+            return Cell(self.grid, self.row+1, self.column)
+        return None
+
+    @property
+    def west(self):
+        if self.column > 0:
+            return Cell(self.grid, self.row, self.column-1)
+        return None
+
+    @property
+    def east(self):
+        if self.column+1 < self.grid.num_columns:
+            return Cell(self.grid, self.row, self.column+1)
+        return None
+
+    def link(self, cell):
+        ''' Carve a connection to another cell (i.e. the maze connects them).
+            Both cells share the wall between them, so this links them
+            in both directions at once.
+        '''
+        self.grid.link(self.row, self.column, cell.row, cell.column)
+
+    def unlink(self, cell):
+        ''' Remove a connection to another cell (i.e. the maze
             does not connect the two cells)
-            
-            Argument bidirectional is here so that I can call unlink on either
-            of the two cells and both will be unlinked.
+
+            Both cells share the wall between them, so the connection is
+            always removed in both directions.
         '''
-        assert isinstance(cell, Cell)
-        del self.links[cell]
-        if bidirectional:
-            cell.unlink(self, bidirectional=False)
-            
+        self.grid.unlink(self.row, self.column, cell.row, cell.column)
+
     def is_linked(self, cell):
         ''' Test if this cell is connected to another cell.
-            
+
             Returns: True or False
         '''
-        assert isinstance(cell, Cell)
-        if cell in self.links.keys():
-            return True
-        else:
-            return False
-        
+        return self.grid.is_linked(self.row, self.column, cell.row, cell.column)
+
+    def link_dir(self, direction):
+        ''' Carve a connection to the neighbor in a direction (N, S, E or W).'''
+        dr, dc = _DIRECTION_OFFSETS[direction]
+        assert 0 <= self.row+dr < self.grid.num_rows
+        assert 0 <= self.column+dc < self.grid.num_columns
+        self.grid.link(self.row, self.column, self.row+dr, self.column+dc)
+
+    def is_linked_dir(self, direction):
+        ''' Test if this cell is connected in a direction (N, S, E or W).
+            The outer walls are always up, so this is False off the grid.
+        '''
+        return bool(self.links_mask & direction)
+
+    @property
+    def links_mask(self):
+        ''' The open sides of this cell, as N|S|E|W bits. '''
+        r, c = self.row, self.column
+        h_walls, v_walls = self.grid.h_walls, self.grid.v_walls
+        return ((not h_walls[r, c]) * N | (not h_walls[r+1, c]) * S |
+                (not v_walls[r, c+1]) * E | (not v_walls[r, c]) * W)
+
     def all_links(self):
         ''' Return a list of all cells that we are connected to.'''
-        all_links_list = self.links.keys()
-        return all_links_list
+        return [Cell(self.grid, r, c)
+                for r, c in self.grid.neighbors(self.row, self.column)
+                if self.grid.is_linked(self.row, self.column, r, c)]
 
     def link_count(self):
         ''' Return the number of cells that we are connected to.'''
-        link_count_value = len(self.all_links())
+        link_count_value = bin(self.links_mask).count('1')
         return link_count_value
-        
+
     def neighbors(self):
         ''' Return a list of all geographical neighboring cells, regardless
             of any connections.  Only returns actual cells, never a None.
         '''
-        neighbors_list = []
-        if self.north is not None:
-            neighbors_list.append(self.north)
-        if self.south is not None:
-            neighbors_list.append(self.south)
-        if self.west is not None:
-            neighbors_list.append(self.west)
-        if self.east is not None:
-            neighbors_list.append(self.east)
+        return [Cell(self.grid, r, c)
+                for r, c in self.grid.neighbors(self.row, self.column)]
 
-        return neighbors_list
+    def __eq__(self, other):
+        return (isinstance(other, Cell) and self.grid is other.grid
+                and self.row == other.row and self.column == other.column)
 
-    def cell_visited(self):
-        self.visit = True
+    def __hash__(self):
+        return hash((self.row, self.column))
 
-    def is_visited(self):
-        if self.visit == True:
-            return True
-        else:
-            return False
-                
     def __str__(self):
         return f'Cell at {self.row}, {self.column}'
-        
+
 
 class Grid:
-    ''' A container to hold all the cells in a maze. The grid is a 
+    ''' A container to hold all the cells in a maze. The grid is a
         rectangular collection, with equal numbers of columns in each
         row and vis versa.
+
+        The maze is stored as two arrays of walls rather than as cells:
+          h_walls[r, c] is the wall on the north side of cell (r, c), so
+                        h_walls[r+1, c] is its south side.  Shape (R+1, C).
+          v_walls[r, c] is the wall on the west side of cell (r, c), so
+                        v_walls[r, c+1] is its east side.  Shape (R, C+1).
+        A 1 means there is a wall, a 0 means the two cells are linked.
+        Anything that writes to the wall arrays directly must increment
+        wall_version so that cached drawings get rebuilt.
     '''
-    
+
     def __init__(self, num_rows, num_columns):
         assert num_rows > 0
         assert num_columns > 0
         self.num_rows = num_rows
         self.num_columns = num_columns
-        self.grid = self.create_cells()
-        self.connect_cells()
-        
-    def create_cells(self):
-        ''' Call the cells into being.  Keep track of them in a list
-            for each row and a list of all rows (i.e. a 2d list-of-lists).
-            
-            Do not connect the cells, as their neighbors may not yet have
-            been created.
+        self.h_walls = np.ones((num_rows+1, num_columns), dtype=np.uint8)
+        self.v_walls = np.ones((num_rows, num_columns+1), dtype=np.uint8)
+        self.wall_version = 0  # Bumped whenever the walls change
+        self._wall_text = None
+
+    def _wall(self, row1, column1, row2, column2):
+        ''' Find the wall separating two adjacent cells.
+
+            Returns: Tuple of (wall array, index into that array)
         '''
-        #assert len(all_rows) == self.num_rows
-        all_rows = []
-        for row in range(self.num_rows):
-            temp = [Cell(row, column) for column in range(self.num_columns)]
-            all_rows.append(temp)
+        # Both cells must be on the grid, so the outer walls stay up
+        assert 0 <= row1 < self.num_rows and 0 <= column1 < self.num_columns
+        assert 0 <= row2 < self.num_rows and 0 <= column2 < self.num_columns
+        if row1 == row2:
+            assert abs(column1 - column2) == 1
+            return self.v_walls, (row1, max(column1, column2))
+        assert column1 == column2 and abs(row1 - row2) == 1
+        return self.h_walls, (max(row1, row2), column1)
 
-        return all_rows
-            
-    def connect_cells(self):
-        ''' Now that all the cells have been created, connect them to 
-            each other. 
+    def link(self, row1, column1, row2, column2):
+        ''' Knock down the wall between two adjacent cells. '''
+        walls, index = self._wall(row1, column1, row2, column2)
+        walls[index] = 0
+        self.wall_version += 1
+
+    def unlink(self, row1, column1, row2, column2):
+        ''' Put back the wall between two adjacent cells. '''
+        walls, index = self._wall(row1, column1, row2, column2)
+        walls[index] = 1
+        self.wall_version += 1
+
+    def is_linked(self, row1, column1, row2, column2):
+        ''' Test if two adjacent cells are connected.
+
+            Returns: True or False
         '''
-        for list in self.grid:
-            for cell in list:
-                if cell.row-1 >= 0:
-                    cell.north = self.grid[cell.row-1][cell.column]
-                if cell.row+1 < self.num_rows:
-                    cell.south = self.grid[cell.row+1][cell.column]
-                if cell.column-1 >= 0:
-                    cell.west = self.grid[cell.row][cell.column-1]
-                if cell.column+1 < self.num_columns:
-                    cell.east = self.grid[cell.row][cell.column+1]
-        
+        walls, index = self._wall(row1, column1, row2, column2)
+        return not walls[index]
+
+    def link_mask(self):
+        ''' Return a uint8 array with the open sides of every cell as
+            N|S|E|W bits (see Cell.links_mask).
+        '''
+        return ((1 - self.h_walls[:-1]) * N | (1 - self.h_walls[1:]) * S |
+                (1 - self.v_walls[:, 1:]) * E | (1 - self.v_walls[:, :-1]) * W)
+
+    def neighbors(self, row, column):
+        ''' Return a list of (row, column) locations of all geographical
+            neighbors of a cell, in NSWE order, regardless of any connections.
+        '''
+        neighbors_list = []
+        if row > 0:
+            neighbors_list.append((row-1, column))
+        if row+1 < self.num_rows:
+            neighbors_list.append((row+1, column))
+        if column > 0:
+            neighbors_list.append((row, column-1))
+        if column+1 < self.num_columns:
+            neighbors_list.append((row, column+1))
+        return neighbors_list
+
     def cell_at(self, row, column):
         ''' Retrieve the cell at a particular row/column index.'''
-        cell_at_loc = self.grid[row][column]
-        return cell_at_loc
-        
+        assert 0 <= row < self.num_rows
+        assert 0 <= column < self.num_columns
+        return Cell(self, row, column)
+
     def deadends(self):
         ''' Return a list of all cells that are deadends (i.e. only link to
             one other cell).
         '''
-        dead_end = []
-        if len(Cell.all_links()) == 1:
-            dead_end.append(Cell)
-        return dead_end
-                            
+        open_n = 1 - self.h_walls[:-1]
+        open_s = 1 - self.h_walls[1:]
+        open_w = 1 - self.v_walls[:, :-1]
+        open_e = 1 - self.v_walls[:, 1:]
+        rows, columns = np.where(open_n + open_s + open_w + open_e == 1)
+        return [Cell(self, r, c) for r, c in zip(rows.tolist(), columns.tolist())]
+
     def each_cell(self):
-        ''' A generator.  Each time it is called, it will return one of 
+        ''' A generator.  Each time it is called, it will return one of
             the cells in the grid.
         '''
         for row in range(self.num_rows):
             for col in range(self.num_columns):
-                c = self.cell_at(row, col)
-                yield c
-                
+                yield Cell(self, row, col)
+
     def each_row(self):
         ''' A row is a list of cells.'''
-        for row in self.grid:
-            yield row
-               
+        for row in range(self.num_rows):
+            yield [Cell(self, row, col) for col in range(self.num_columns)]
+
     def random_cell(self):
         ''' Chose one of the cells in an independent, uniform distribution. '''
-        randomcell = random.choice(random.choice(self.grid))
-        return randomcell
+        row, column = divmod(random.randrange(self.size()), self.num_columns)
+        return self.cell_at(row, column)
         
     def size(self):
         ''' How many cells are in the grid? '''
@@ -178,29 +259,33 @@ class Grid:
         '''
         self.markup = markup
         
+    def _render_walls(self):
+        ''' Build the text for the walls, which only changes when the maze
+            does.  Cached until wall_version moves on.
+
+            Returns: Tuple of (list of east-wall characters for each row,
+                     list of the wall line below each row)
+        '''
+        if self._wall_text is not None and self._wall_text[0] == self.wall_version:
+            return self._wall_text[1], self._wall_text[2]
+        east_walls = np.where(self.v_walls[:, 1:], '|', ' ').tolist()
+        south_lines = ['+' + ''.join(row) + '\n' for row in
+                       np.where(self.h_walls[1:], '---+', '   +').tolist()]
+        self._wall_text = (self.wall_version, east_walls, south_lines)
+        return east_walls, south_lines
+
     def __str__(self):
-        ret_val = '+' + '---+' * self.num_columns + '\n'
-        for row in self.grid:
-            ret_val += '|'
-            for cell in row:
-                cell_value = self.markup[cell]
-                ret_val += '{:^3s}'.format(str(cell_value))
-                if not cell.east:
-                    ret_val += '|'
-                elif cell.east.is_linked(cell):
-                    ret_val += ' '
-                else:
-                    ret_val += '|'
-            ret_val += '\n+'
-            for cell in row:
-                if not cell.south:
-                    ret_val += '---+'
-                elif cell.south.is_linked(cell):
-                    ret_val += '   +'
-                else:
-                    ret_val += '---+'
-            ret_val += '\n'
-        return ret_val
+        east_walls, south_lines = self._render_walls()
+        parts = ['+' + '---+' * self.num_columns + '\n']
+        for row, (east, south) in enumerate(zip(east_walls, south_lines)):
+            parts.append('|')
+            for column, wall in enumerate(east):
+                value = self.markup.get_item_at(row, column)
+                parts.append('{:^3s}'.format(str(value)))
+                parts.append(wall)
+            parts.append('\n')
+            parts.append(south)
+        return ''.join(parts)
         
 class Markup:
     ''' A Markup is a way to add data to a grid.  It is associated with
@@ -211,45 +296,102 @@ class Markup:
         Subclasses could have other stuff, of course
     '''
     
-    def __init__(self, grid, default=' '):
+    def __init__(self, grid, default=' ', dtype=None):
         self.grid = grid
-        self.marks = {}  # Key: cell, Value = some object
         self.default = default
+        self.dtype = dtype
+        self.version = 0  # Bumped whenever the marks change
+        self.reset()
         
     def reset(self):
-        self.marks = {}
+        ''' Set every cell back to the default.  Marks are kept in an
+            array indexed by [row, column].  Without a dtype it is an object
+            array, so any value can be stored; pass a NumPy dtype to get a
+            numeric array instead.
+        '''
+        dtype = object if self.dtype is None else self.dtype
+        self.marks = np.full((self.grid.num_rows, self.grid.num_columns),
+                             self.default, dtype=dtype)
+        # Which cells have been given a mark; max() and min() only look
+        # at these
+        self.has_mark = np.zeros(self.marks.shape, dtype=bool)
+        self.version += 1
         
     def __setitem__(self, cell, value):
-        self.marks[cell] = value
+        self.marks[cell.row, cell.column] = value
+        self.has_mark[cell.row, cell.column] = True
+        self.version += 1
         
     def __getitem__(self, cell):
-        return self.marks.get(cell, self.default)
+        return self.marks[cell.row, cell.column]
         
     def set_item_at(self, row, column, value):
         assert row >= 0 and row < self.grid.num_rows
         assert column >= 0 and column < self.grid.num_columns
-        cell = self.grid.cell_at(row, column)
-        if cell:
-            self.marks[cell]=value
-        else:
-            raise IndexError
+        self.marks[row, column] = value
+        self.has_mark[row, column] = True
+        self.version += 1
     
     def get_item_at(self, row, column):
         assert row >= 0 and row < self.grid.num_rows
         assert column >= 0 and column < self.grid.num_columns
-        cell = self.grid.cell_at(row, column)
-        if cell:
-            return self.marks.get(cell)
-        else:
-            raise IndexError
+        return self.marks[row, column]
             
+    def _extreme_cell(self, arg_extreme):
+        ''' Find the marked cell picked by np.argmax or np.argmin over the
+            marked values only.  Raises ValueError if nothing is marked.
+        '''
+        rows, columns = np.nonzero(self.has_mark)
+        if len(rows) == 0:
+            raise ValueError('no cells have been marked')
+        i = arg_extreme(self.marks[rows, columns])
+        return self.grid.cell_at(int(rows[i]), int(columns[i]))
+
     def max(self):
         ''' Return the cell with the largest markup value. '''
-        return max(self.marks.keys(), key=self.__getitem__)
+        return self._extreme_cell(np.argmax)
 
     def min(self):
-        ''' Return the cell with the largest markup value. '''
-        return min(self.marks.keys(), key=self.__getitem__)
+        ''' Return the cell with the smallest markup value. '''
+        return self._extreme_cell(np.argmin)
+
+@njit(cache=True)
+def _bfs_nb(h_walls, v_walls, R, C, r0, c0):
+    ''' Breadth-first search from (r0, c0).  Every passage has length 1,
+        so this gives the same distances as Dijkstra's algorithm.  The
+        wall arrays can be written directly, so the search checks bounds
+        rather than trusting the outer walls to be up.
+
+        Returns: int32 array of distances, -1 for unreachable cells
+    '''
+    dist = np.full((R, C), -1, dtype=np.int32)
+    queue = np.empty(R * C, dtype=np.int32)
+    head = 0
+    tail = 1
+    queue[0] = r0 * C + c0
+    dist[r0, c0] = 0
+    while head < tail:
+        r = queue[head] // C
+        c = queue[head] % C
+        head += 1
+        d = dist[r, c] + 1
+        if r > 0 and not h_walls[r, c] and dist[r-1, c] < 0:
+            dist[r-1, c] = d
+            queue[tail] = (r-1) * C + c
+            tail += 1
+        if r+1 < R and not h_walls[r+1, c] and dist[r+1, c] < 0:
+            dist[r+1, c] = d
+            queue[tail] = (r+1) * C + c
+            tail += 1
+        if c > 0 and not v_walls[r, c] and dist[r, c-1] < 0:
+            dist[r, c-1] = d
+            queue[tail] = r * C + c - 1
+            tail += 1
+        if c+1 < C and not v_walls[r, c+1] and dist[r, c+1] < 0:
+            dist[r, c+1] = d
+            queue[tail] = r * C + c + 1
+            tail += 1
+    return dist
 
 class DijkstraMarkup(Markup):
     ''' A markup class that will run Djikstra's algorithm and keep track
@@ -260,7 +402,11 @@ class DijkstraMarkup(Markup):
         ''' Execute the algorithm and store each cell's value in self.marks[]
         '''
         super().__init__(grid, default)
-        pass
+        self.marks = _bfs_nb(grid.h_walls, grid.v_walls,
+                             grid.num_rows, grid.num_columns,
+                             root_cell.row, root_cell.column)
+        self.has_mark = self.marks >= 0
+        self.marks[~self.has_mark] = default
             
     def farthest_cell(self):
         ''' Find the cell with the largest markup value, which will
@@ -268,7 +414,8 @@ class DijkstraMarkup(Markup):
             
             Returns: Tuple of (cell, distance)
         '''
-        pass
+        cell = self.max()
+        return cell, int(self[cell])
 
 class ShortestPathMarkup(DijkstraMarkup):
     ''' Given a starting cell and a goal cell, create a Markup that will
@@ -304,6 +451,7 @@ class ColorizedMarkup(Markup):
         assert channel in 'RGB'
         super().__init__(grid)
         self.channel = channel
+        self.color_arr = None  # uint8 array of shape (rows, columns, 3)
         
     def colorize_dijkstra(self, start_row = None, start_column = None):
         ''' Provide colors for the maze based on their distance from
@@ -321,20 +469,60 @@ class ColorizedMarkup(Markup):
         ''' Given a markup of numeric values, colorize based on
             the relationship to the max numeric value.
         '''
-        max = markup.max()
-        max_value = markup[max]
-        for c in self.grid.each_cell():
-            cell_value = markup[c]
-            intensity = (max_value - cell_value) / max_value
-            dark   = round(255 * intensity)
-            bright = round(127 * intensity) + 128
-            if self.channel == 'R':
-                self.marks[c] = [bright, dark, dark]
-            elif self.channel == 'G':
-                self.marks[c] = [dark, bright, dark]
-            else:
-                self.marks[c] = [dark, dark, bright]   
-                                       
+        values = markup.marks.astype(np.float32)
+        max_value = values.max()
+        if max_value > 0:
+            intensity = np.clip((max_value - values) / max_value, 0, 1)
+        else:
+            intensity = np.ones_like(values)
+        dark   = np.round(255 * intensity).astype(np.uint8)
+        bright = (np.round(127 * intensity) + 128).astype(np.uint8)
+        if self.channel == 'R':
+            self.color_arr = np.stack((bright, dark, dark), axis=-1)
+        elif self.channel == 'G':
+            self.color_arr = np.stack((dark, bright, dark), axis=-1)
+        else:
+            self.color_arr = np.stack((dark, dark, bright), axis=-1)
+        self.version += 1
+
+    def __getitem__(self, cell):
+        if self.color_arr is None:
+            return super().__getitem__(cell)
+        return self.color_arr[cell.row, cell.column].tolist()
+
+    def get_item_at(self, row, column):
+        if self.color_arr is None:
+            return super().get_item_at(row, column)
+        return self.color_arr[row, column].tolist()
+
+    def __setitem__(self, cell, value):
+        if self.color_arr is None:
+            super().__setitem__(cell, value)
+        else:
+            self.color_arr[cell.row, cell.column] = value
+            self.version += 1
+
+    def set_item_at(self, row, column, value):
+        if self.color_arr is None:
+            super().set_item_at(row, column, value)
+        else:
+            self.color_arr[row, column] = value
+            self.version += 1
+
+@njit(cache=True)
+def _seed_nb(n):
+    ''' Numba keeps its own random state, separate from NumPy's. '''
+    np.random.seed(n)
+
+def seed(n):
+    ''' Seed every random number generator the maze algorithms use:
+        Python's random, NumPy's global generator, and the one inside the
+        Numba kernels.  The same seed gives the same maze.
+    '''
+    random.seed(n)
+    np.random.seed(n)
+    _seed_nb(n)
+
 def binary_tree(grid):
     ''' The Binary Tree Algorithm.
       
@@ -345,20 +533,30 @@ def binary_tree(grid):
         Except if there are no cells to the north or east (in which case
         don't link it to anything.)
     '''
-    #for list in grid:
-    for cell in grid.grid[0]:
-        if cell != grid.grid[0][-1]:
-            cell.link(cell.east)
-    for i in range(1, len(grid.grid)):
-        #t = type(grid.grid[i][-1].north)
-        #print(t)
-        grid.grid[i][-1].link(grid.grid[i][-1].north)
-    for i in range(1, len(grid.grid)):
-        for j in range(len(grid.grid[0])-1):
-            grid.grid[i][j].link(random.choice([grid.grid[i][j].north, grid.grid[i][j].east]))
+    # One coin flip per cell that has both choices: True carves east,
+    # False carves north.
+    go_east = np.random.random((grid.num_rows-1, grid.num_columns-1)) < 0.5
+    grid.v_walls[1:, 1:-1][go_east] = 0
+    grid.h_walls[1:-1, :-1][~go_east] = 0
+    grid.v_walls[0, 1:-1] = 0   # top row can only go east
+    grid.h_walls[1:-1, -1] = 0  # east column can only go north
+    grid.wall_version += 1
 
+@njit(cache=True)
+def _sidewinder_nb(h_walls, v_walls, probs, odds):
+    ''' Carve rows 1 and down.  probs[i-1, j] is the random draw for cell
+        (i, j); a run is kept as its first column, run_start.
+    '''
+    R, C = probs.shape[0] + 1, probs.shape[1]
+    for i in range(1, R):
+        run_start = 0
+        for j in range(C):
+            if probs[i-1, j] >= odds and j != C - 1:
+                v_walls[i, j+1] = 0
+            else:
+                h_walls[i, np.random.randint(run_start, j+1)] = 0
+                run_start = j + 1
 
-            
 def sidewinder(grid, odds=.5):
     ''' The Sidewinder algorithm.
     
@@ -379,22 +577,134 @@ def sidewinder(grid, odds=.5):
     '''
     assert odds >= 0.0
     assert odds < 1.0    
-    for cell in grid.grid[0]:
-        if cell != grid.grid[0][-1]:
-            cell.link(cell.east)
-    for i in range(1, grid.num_rows):
-        tmplist = []
-        for j in range(0,grid.num_columns):
-            if random.uniform(0, 1) >= odds and j != grid.num_columns - 1:
-                tmplist.append(grid.grid[i][j])
-                tmplist[-1].link(grid.grid[i][j+1])
-                tmplist.append(grid.grid[i][j+1])
-            else:
-                tmplist.append(grid.grid[i][j])
-                chose = random.choice(tmplist)
-                chose.link(chose.north)
-                tmplist.clear()
+    grid.v_walls[0, 1:-1] = 0  # top row is a single run
+    probs = np.random.random((grid.num_rows-1, grid.num_columns))
+    _sidewinder_nb(grid.h_walls, grid.v_walls, probs, odds)
+    grid.wall_version += 1
                 
+@njit(cache=True)
+def _knock_down(h_walls, v_walls, row1, column1, row2, column2):
+    ''' Remove the wall between two adjacent cells (Numba version of
+        Grid.link).
+    '''
+    if row1 == row2:
+        v_walls[row1, max(column1, column2)] = 0
+    else:
+        h_walls[max(row1, row2), column1] = 0
+
+@njit(cache=True)
+def _next_direction(bits, left):
+    ''' Take a random direction (0-3) two bits at a time from one random
+        draw, so a walk calls the generator once per 15 steps.
+
+        Returns: Tuple of (direction, remaining bits, directions left)
+    '''
+    if left == 0:
+        bits = np.random.randint(0, 1 << 30)
+        left = 15
+    return bits & 3, bits >> 2, left - 1
+
+@njit(cache=True)
+def _remove_unvisited(unvisited, pos, size, index):
+    ''' Drop a flat cell index from unvisited[:size] in O(1) by moving the
+        last entry into its slot.  pos[index] is the slot holding index.
+
+        Returns: the new size
+    '''
+    slot = pos[index]
+    last = unvisited[size-1]
+    unvisited[slot] = last
+    pos[last] = slot
+    return size - 1
+
+@njit(cache=True)
+def _aldous_broder_nb(h_walls, v_walls, visited, R, C, r0, c0):
+    ''' Random walk from (r0, c0) until every cell is visited.
+
+        Returns: the number of steps taken
+    '''
+    visited[r0, c0] = 1
+    remaining = R * C - 1
+    r, c = r0, c0
+    steps = 0
+    bits, left = 0, 0
+    while remaining > 0:
+        d, bits, left = _next_direction(bits, left)
+        nr = r + _DR[d]
+        nc = c + _DC[d]
+        if nr < 0 or nr >= R or nc < 0 or nc >= C:
+            continue
+        if not visited[nr, nc]:
+            _knock_down(h_walls, v_walls, r, c, nr, nc)
+            visited[nr, nc] = 1
+            remaining -= 1
+        r, c = nr, nc
+        steps += 1
+    return steps
+
+@njit(cache=True)
+def _wilson_nb(h_walls, v_walls, visited, R, C, r0, c0):
+    ''' Loop-erased random walks until every cell is visited.  The walk
+        is kept in path[:path_len] as flat cell indices (row * C + column),
+        and the cells not yet in the maze in unvisited[:remaining].
+        path_index[cell] is the cell's position in the path, or -1, so
+        finding a loop is a single lookup.
+
+        Returns: Tuple of (number of walks, number of loops removed)
+    '''
+    num_cells = R * C
+    unvisited = np.arange(num_cells, dtype=np.int32)
+    pos = np.arange(num_cells, dtype=np.int32)
+    visited[r0, c0] = 1
+    remaining = _remove_unvisited(unvisited, pos, num_cells, r0 * C + c0)
+    path = np.empty(num_cells, dtype=np.int32)
+    path_index = np.full(num_cells, -1, dtype=np.int32)
+    walks = 0
+    loops_removed = 0
+    bits, left = 0, 0
+    while remaining > 0:
+        start = unvisited[np.random.randint(remaining)]
+        walks += 1
+        path[0] = start
+        path_index[start] = 0
+        path_len = 1
+        while True:
+            r = path[path_len-1] // C
+            c = path[path_len-1] % C
+            d, bits, left = _next_direction(bits, left)
+            nr = r + _DR[d]
+            nc = c + _DC[d]
+            if nr < 0 or nr >= R or nc < 0 or nc >= C:
+                continue
+            if visited[nr, nc]:
+                # Ran into the maze: carve the whole path into it.  The
+                # path cells are visited from now on, so their path_index
+                # entries are never looked at again.
+                for i in range(path_len):
+                    r = path[i] // C
+                    c = path[i] % C
+                    if i + 1 < path_len:
+                        _knock_down(h_walls, v_walls, r, c,
+                                    path[i+1] // C, path[i+1] % C)
+                    else:
+                        _knock_down(h_walls, v_walls, r, c, nr, nc)
+                    visited[r, c] = 1
+                    remaining = _remove_unvisited(unvisited, pos, remaining,
+                                                  path[i])
+                break
+            next_index = nr * C + nc
+            loop_at = path_index[next_index]
+            if loop_at >= 0:
+                loops_removed += 1
+                for i in range(loop_at + 1, path_len):
+                    path_index[path[i]] = -1
+                path_len = loop_at + 1
+            else:
+                path_index[next_index] = path_len
+                path[path_len] = next_index
+                path_len += 1
+    return walks, loops_removed
+
 def aldous_broder(grid):
     ''' The Aldous-Broder algorithm is a random-walk algorithm.
     
@@ -406,33 +716,11 @@ def aldous_broder(grid):
         Continue until all cells have been visited.
     '''
     start_cell = grid.random_cell()
-    cell_notvisited = []
-    for alllist in grid.grid:
-        for cell in alllist:
-            cell_notvisited.append(cell)
-    
-    start_cell.cell_visited = True
-    cell_notvisited.remove(start_cell)
-
-    iteration_count = 0
-    while len(cell_notvisited) != 0:
-        cell_to_link = random.choice(start_cell.neighbors())
-
-        
-        if cell_to_link.cell_visited != True:
-            start_cell.link(cell_to_link)
-            cell_to_link.cell_visited = True
-
-            cell_notvisited.remove(cell_to_link)
-
-            start_cell = cell_to_link
-            iteration_count += 1
-            #print(grid.size)
-            #print(len(cell_visited))
-        else:
-            start_cell = cell_to_link
-            iteration_count += 1
-
+    visited = np.zeros((grid.num_rows, grid.num_columns), dtype=np.uint8)
+    iteration_count = _aldous_broder_nb(grid.h_walls, grid.v_walls, visited,
+                                        grid.num_rows, grid.num_columns,
+                                        start_cell.row, start_cell.column)
+    grid.wall_version += 1
     print(f'Aldous-Broder executed on a grid of size {grid.size()} in {iteration_count} steps.')
     
 def wilson(grid):
@@ -459,71 +747,46 @@ def wilson(grid):
         BTW, it  may be easier to manage a  list of unvisited cells, which 
         makes it simpler to choose a random unvisited cell, for instance.   
     '''
-    
- 
-    cell_unused = [] #unuse cells
-    tmpgrids = [] #walked cells
-    
-    for alllist in grid.grid:
-        for cell in alllist:           
-            cell_unused.append(cell)
-
-    print(len(cell_unused))
-    
-
-    chosen_cell = grid.random_cell() #chose marked cell
-    cell_unused.remove(chosen_cell)
-    print('firstremovedcell',chosen_cell)
-    
-    loops_removed = 0
-    first_cell = random.choice(cell_unused)
-    
-    print('first探路cell',first_cell)
-    tmpgrids.append(first_cell)
-    
-    while True:  
-        print(len(cell_unused))
-        
-        
-        
-        next_cell = random.choice(first_cell.neighbors())
-        
-        if next_cell not in cell_unused:                
-            print('碰到走过的了',next_cell)
-            for i, cell in enumerate(tmpgrids):
-                
-                if tmpgrids[i] != tmpgrids[-1] :
-                    tmpgrids[i].link(tmpgrids[i+1])
-                    print(tmpgrids[i],'link',tmpgrids[i+1])
-                    
-                print('tryremove',tmpgrids[i])
-                cell_unused.remove(tmpgrids[i])
-           
-            tmpgrids[-1].link(next_cell)
-            print(tmpgrids[-1],'link',next_cell)
-            tmpgrids.clear()
-            if  len(cell_unused) == 0:
-                break
-            first_cell = random.choice(cell_unused) 
-            tmpgrids.append(first_cell)
-        elif next_cell in tmpgrids:
-            loops_removed += 1
-            while tmpgrids[-1] != next_cell:
-                    tmpgrids.pop()
-            first_cell = tmpgrids[-1]
-
-        else: 
-            print('探路',next_cell)
-            tmpgrids.append(next_cell)
-            first_cell = next_cell
-            
-
-
-    
-                 
-    print(f'Wilson executed on a grid of size {grid.size()} with {first_cell}', end='')
+    chosen_cell = grid.random_cell()
+    visited = np.zeros((grid.num_rows, grid.num_columns), dtype=np.uint8)
+    walks, loops_removed = _wilson_nb(grid.h_walls, grid.v_walls, visited,
+                                      grid.num_rows, grid.num_columns,
+                                      chosen_cell.row, chosen_cell.column)
+    grid.wall_version += 1
+    print(f'Wilson executed on a grid of size {grid.size()} with {walks}', end='')
     print(f' random cells choosen and {loops_removed} loops removed')
             
+@njit(cache=True)
+def _recursive_backtracker_nb(h_walls, v_walls, visited, R, C, r0, c0):
+    ''' Depth-first carve from (r0, c0) using an explicit stack of flat
+        cell indices (row * C + column).
+    '''
+    stack = np.empty(R * C, dtype=np.int32)
+    stack[0] = r0 * C + c0
+    sp = 1
+    visited[r0, c0] = 1
+    directions = np.arange(4)
+    while sp > 0:
+        r = stack[sp-1] // C
+        c = stack[sp-1] % C
+        # Fisher-Yates shuffle of the four directions
+        for i in range(3, 0, -1):
+            j = np.random.randint(i + 1)
+            directions[i], directions[j] = directions[j], directions[i]
+        moved = False
+        for d in directions:
+            nr = r + _DR[d]
+            nc = c + _DC[d]
+            if 0 <= nr < R and 0 <= nc < C and not visited[nr, nc]:
+                _knock_down(h_walls, v_walls, r, c, nr, nc)
+                visited[nr, nc] = 1
+                stack[sp] = nr * C + nc
+                sp += 1
+                moved = True
+                break
+        if not moved:
+            sp -= 1
+
 def recursive_backtracker(grid, start_cell=None):
     ''' Recursive Backtracker is a high-river maze algorithm.
     
@@ -539,7 +802,13 @@ def recursive_backtracker(grid, start_cell=None):
         the code will be quite short), but for large mazes you will be making lots of 
         function calls and you risk running out of stack space.
     '''
-    pass
+    if start_cell is None:
+        start_cell = grid.random_cell()
+    visited = np.zeros((grid.num_rows, grid.num_columns), dtype=np.uint8)
+    _recursive_backtracker_nb(grid.h_walls, grid.v_walls, visited,
+                              grid.num_rows, grid.num_columns,
+                              start_cell.row, start_cell.column)
+    grid.wall_version += 1
         
     
         
\ No newline at end of file
@@ -1,7 +1,7 @@
 #! /usr/bin/env python3
 ''' Show off mazes and their algorithms. '''
+import numpy as np
 import pygame
-import pygame.gfxdraw
 from pygame.locals import *
 import mazes
 import sys
@@ -9,6 +9,14 @@ import sys
 #设置网格大小
 n = 50
 
+wall_color = (100,100,100)
+
+# The last frame drawn by display_grid:
+#   (grid, wall_version, markup, markup version, surface)
+_last_frame = None
+# The last wall overlay built by wall_surface: (grid, wall_version, surface)
+_last_walls = None
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode([800,500])
@@ -65,40 +73,50 @@ def main():
 
 
 
+def wall_surface(g):
+    ''' Draw every wall of the grid into a transparent surface at once,
+        working on a pixel mask built from the grid's wall arrays.  The
+        surface is rebuilt only when the walls change.
+    '''
+    global _last_walls
+    if (_last_walls is not None and _last_walls[0] is g
+            and _last_walls[1] == g.wall_version):
+        return _last_walls[2]
+    mask = np.zeros((g.num_rows * n, g.num_columns * n), dtype=bool)
+    mask[0::n, :]   |= np.repeat(g.h_walls[:-1], n, axis=1).astype(bool)  # north
+    mask[n-1::n, :] |= np.repeat(g.h_walls[1:], n, axis=1).astype(bool)   # south
+    mask[:, 0::n]   |= np.repeat(g.v_walls[:, :-1], n, axis=0).astype(bool)  # west
+    mask[:, n-1::n] |= np.repeat(g.v_walls[:, 1:], n, axis=0).astype(bool)   # east
+    pixels = np.zeros(mask.shape + (3,), dtype=np.uint8)
+    pixels[mask] = wall_color
+    surface = pygame.Surface((g.num_columns * n, g.num_rows * n))
+    pygame.surfarray.blit_array(surface, pixels.swapaxes(0, 1))
+    surface.set_colorkey((0,0,0))
+    _last_walls = (g, g.wall_version, surface)
+    return surface
+
 def display_grid(g, markup, screen):
+    global _last_frame
+    markup_version = getattr(markup, 'version', None)
+    if (_last_frame is not None and _last_frame[0] is g
+            and _last_frame[1] == g.wall_version and _last_frame[2] is markup
+            and _last_frame[3] == markup_version):
+        screen.blit(_last_frame[4], (0, 0))
+        return
     screen.fill((0,0,0))
-    for row in range(g.num_rows):
-        for col in range(g.num_columns):
-            c = g.cell_at(row, col)
-            cell_x = col * n
-            cell_y = row * n
-            # Draw top row
-            if markup:
+    if getattr(markup, 'color_arr', None) is not None:
+        img = np.repeat(np.repeat(markup.color_arr, n, axis=0), n, axis=1)
+        screen.blit(pygame.surfarray.make_surface(img.swapaxes(0, 1)), (0, 0))
+    elif markup:
+        for row in range(g.num_rows):
+            for col in range(g.num_columns):
                 value = markup.get_item_at(row, col)
-                if not value:
-                    continue
-
                 if isinstance(value, list) and len(value) == 3:
                     pygame.draw.rect(screen,
                                      value,  # color
-                                     (cell_x, cell_y, n, n))
-
-            if not c.north or not c.is_linked(c.north):
-                pygame.gfxdraw.hline(screen, 
-                                     cell_x, cell_x+n-1, cell_y, 
-                                     (100,100,100))
-            if not c.south or not c.is_linked(c.south):
-                pygame.gfxdraw.hline(screen, 
-                                     cell_x, cell_x+n-1, cell_y+n-1, 
-                                     (100,100,100))
-            if not c.east or not c.is_linked(c.east):
-                pygame.gfxdraw.vline(screen, 
-                                     cell_x+n-1, cell_y, cell_y+n-1, 
-                                     (100,100,100))
-            if not c.west or not c.is_linked(c.west):
-                pygame.gfxdraw.vline(screen, 
-                                     cell_x, cell_y, cell_y+n-1, 
-                                     (100,100,100))
+                                     (col * n, row * n, n, n))
+    screen.blit(wall_surface(g), (0, 0))
+    _last_frame = (g, g.wall_version, markup, markup_version, screen.copy())
             
 if __name__ == "__main__":
     main()
\ No newline at end of file